@@ -17,10 +17,19 @@ Example:
 import argparse
 import logging
 from pathlib import Path
+from typing import Dict, List
 from tqdm import tqdm
 
-from pdf_processor import PDFProcessor
-from ai_detector import SimpleAIDetector, FastDetectGPTDetector
+from pdf_processor import BoundingBox, PDFProcessor
+from ai_detector import (
+    SimpleAIDetector,
+    FastDetectGPTDetector,
+    MIN_TEXT_LENGTH,
+    default_device,
+    is_boilerplate,
+    load_tokenizer,
+    score_token_ids_in_processes,
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,6 +38,50 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _finish(args: argparse.Namespace, processor: PDFProcessor, boxes: List[BoundingBox]) -> int:
+    """Write the legend if requested and log the summary, once the colorized PDF exists."""
+    # Create legend if requested
+    if args.create_legend:
+        legend_path = Path(args.output_pdf).stem + "_legend.pdf"
+        logger.info(f"Creating legend PDF: {legend_path}")
+        processor.create_visualization_legend(legend_path)
+
+    # Summary statistics
+    logger.info("\n" + "="*60)
+    logger.info("SUMMARY")
+    logger.info("="*60)
+    scores = [box.score for box in boxes if box.score > 0]
+    if scores:
+        avg_score = sum(scores) / len(scores)
+        max_score = max(scores)
+        min_score = min(scores)
+
+        logger.info(f"Total text segments analyzed: {len(scores)}")
+        logger.info(f"Average AI detection score: {avg_score:.3f}")
+        logger.info(f"Minimum score: {min_score:.3f}")
+        logger.info(f"Maximum score: {max_score:.3f}")
+
+        # Count segments by category
+        human_like = sum(1 for s in scores if s < 0.3)
+        mixed = sum(1 for s in scores if 0.3 <= s <= 0.7)
+        ai_like = sum(1 for s in scores if s > 0.7)
+
+        logger.info(f"\nSegment categories:")
+        logger.info(f"  Human-like (score < 0.3): {human_like} ({100*human_like/len(scores):.1f}%)")
+        logger.info(f"  Mixed (0.3 <= score <= 0.7): {mixed} ({100*mixed/len(scores):.1f}%)")
+        logger.info(f"  AI-like (score > 0.7): {ai_like} ({100*ai_like/len(scores):.1f}%)")
+
+    logger.info("="*60)
+    logger.info(f"\n✓ Success! Colorized PDF saved to: {args.output_pdf}")
+    logger.info("\nColor guide:")
+    logger.info("  🟢 Green = Likely human-written")
+    logger.info("  🟡 Yellow = Mixed/uncertain")
+    logger.info("  🔴 Red = Likely AI-generated")
+    logger.info("="*60)
+
+    return 0
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Colorize PDF bounding boxes based on AI-generated text detection scores"
@@ -46,8 +99,8 @@ def main():
     parser.add_argument(
         "--model",
         type=str,
-        default="gpt2",
-        help="Model to use for AI detection (default: gpt2). Options: gpt2, gpt2-medium, gpt2-large, distilgpt2"
+        default="distilgpt2",
+        help="Model to use for AI detection (default: distilgpt2). Options: distilgpt2, gpt2, gpt2-medium, gpt2-large"
     )
     parser.add_argument(
         "--detector",
@@ -84,7 +137,24 @@ def main():
         "--min-text-length",
         type=int,
         default=10,
-        help="Minimum text length to analyze (default: 10 characters)"
+        help="Minimum text length to analyze (default: 10 characters; below 10, segments get the neutral score 0.5)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=32,
+        help="Number of text segments scored per model forward pass (default: 32)"
+    )
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Compile the model with torch.compile (PyTorch 2.0+; slower startup, faster scoring on long documents)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for scoring on CPU, each loading its own model (default: 1, scoring in-process; ignored on GPU)"
     )
 
     args = parser.parse_args()
@@ -99,6 +169,16 @@ def main():
         logger.error("Opacity must be between 0.0 and 1.0")
         return 1
 
+    # Validate batch size
+    if args.batch_size < 1:
+        logger.error("Batch size must be at least 1")
+        return 1
+
+    # Validate worker count
+    if args.workers < 1:
+        logger.error("Workers must be at least 1")
+        return 1
+
     try:
         # Step 1: Initialize PDF processor
         logger.info("="*60)
@@ -126,70 +206,94 @@ def main():
         if args.merge_boxes > 1:
             logger.info(f"\n[2/4] Merging boxes into segments (max {args.merge_boxes} boxes per segment)...")
             boxes = processor.merge_boxes_into_segments(max_boxes_per_segment=args.merge_boxes)
-            processor.bounding_boxes = boxes
             logger.info(f"Created {len(boxes)} text segments")
         else:
             logger.info("\n[2/4] Skipping box merging (merge-boxes=1)")
 
-        # Step 4: Initialize AI detector
+        # Step 4: Pick the segments worth scoring before paying for the model load
+        scorable_boxes = []
+        for box in boxes:
+            length = len(box.text.strip())
+            if length < args.min_text_length or is_boilerplate(box.text):
+                box.score = 0.0  # Don't score very short text, page numbers, URLs, ...
+            elif length < MIN_TEXT_LENGTH:
+                box.score = 0.5  # Too short for the detectors, which give it the neutral score
+            else:
+                scorable_boxes.append(box)
+
+        # Without scorable text or with invisible boxes, skip loading the model
+        # altogether; only segments already holding the neutral score are drawn
+        if not scorable_boxes or args.opacity == 0.0:
+            if not scorable_boxes:
+                logger.warning(f"No prose text segments with at least {args.min_text_length} characters")
+            if args.opacity > 0.0 and any(box.score > 0 for box in boxes):
+                logger.info("Nothing to score; drawing the short segments with the neutral score")
+                processor.colorize_pdf(args.output_pdf, opacity=args.opacity)
+            else:
+                logger.info("Nothing to score; writing uncolorized copy")
+                processor.colorize_pdf(args.output_pdf, opacity=0.0)
+            return _finish(args, processor, boxes)
+
+        # Identical segments (running headers, footers, repeated lines) are scored once
+        unique_boxes = list({box.text: box for box in scorable_boxes}.values())
+        if len(unique_boxes) < len(scorable_boxes):
+            logger.info(f"Skipping {len(scorable_boxes) - len(unique_boxes)} duplicate segments")
+
+        # Step 5: Initialize AI detector
         logger.info(f"\n[3/4] Initializing AI detector ({args.detector})...")
         if args.detector == "simple":
-            detector = SimpleAIDetector(model_name=args.model)
+            detector_cls = SimpleAIDetector
+            detector_kwargs = {"model_name": args.model, "compile_model": args.compile}
+        else:
+            detector_cls = FastDetectGPTDetector
+            detector_kwargs = {"scoring_model_name": args.model, "compile_model": args.compile}
+
+        chunks = [
+            unique_boxes[start:start + args.batch_size]
+            for start in range(0, len(unique_boxes), args.batch_size)
+        ]
+
+        # On CPU, --workers scores chunks in parallel processes, each with its own model
+        workers = args.workers if default_device() == "cpu" else 1
+        in_processes = workers > 1 and len(chunks) > 1
+
+        # The worker processes load the weights themselves, so this process
+        # then only needs the tokenizer
+        if in_processes:
+            tokenizer = load_tokenizer(args.model)
         else:
-            detector = FastDetectGPTDetector(scoring_model_name=args.model)
+            detector = detector_cls(**detector_kwargs)
+            tokenizer = detector.tokenizer
 
-        # Step 5: Score each text box
+        # Step 6: Score each unique text segment
         logger.info("\n[4/4] Scoring text segments for AI detection...")
-        for box in tqdm(boxes, desc="Analyzing text"):
-            if len(box.text.strip()) >= args.min_text_length:
-                box.score = detector.score_text(box.text)
-            else:
-                box.score = 0.0  # Don't score very short text
 
-        # Step 6: Create colorized PDF
-        logger.info("\nCreating colorized PDF...")
-        processor.colorize_pdf(args.output_pdf, opacity=args.opacity)
+        # Tokenize every segment to score up front so the scoring loop only runs the model
+        processor.pretokenize(tokenizer, boxes=unique_boxes)
+        chunk_ids = [[box.input_ids for box in chunk] for chunk in chunks]
 
-        # Step 7: Create legend if requested
-        if args.create_legend:
-            legend_path = Path(args.output_pdf).stem + "_legend.pdf"
-            logger.info(f"Creating legend PDF: {legend_path}")
-            processor.create_visualization_legend(legend_path)
+        if in_processes:
+            logger.info(f"Scoring on {min(workers, len(chunks))} worker processes")
+            chunk_scores = score_token_ids_in_processes(
+                detector_cls, detector_kwargs, chunk_ids, batch_size=args.batch_size, workers=workers
+            )
+        else:
+            chunk_scores = (detector.score_token_ids(ids, batch_size=args.batch_size) for ids in chunk_ids)
 
-        # Summary statistics
-        logger.info("\n" + "="*60)
-        logger.info("SUMMARY")
-        logger.info("="*60)
-        scores = [box.score for box in boxes if box.score > 0]
-        if scores:
-            avg_score = sum(scores) / len(scores)
-            max_score = max(scores)
-            min_score = min(scores)
-
-            logger.info(f"Total text segments analyzed: {len(scores)}")
-            logger.info(f"Average AI detection score: {avg_score:.3f}")
-            logger.info(f"Minimum score: {min_score:.3f}")
-            logger.info(f"Maximum score: {max_score:.3f}")
-
-            # Count segments by category
-            human_like = sum(1 for s in scores if s < 0.3)
-            mixed = sum(1 for s in scores if 0.3 <= s <= 0.7)
-            ai_like = sum(1 for s in scores if s > 0.7)
-
-            logger.info(f"\nSegment categories:")
-            logger.info(f"  Human-like (score < 0.3): {human_like} ({100*human_like/len(scores):.1f}%)")
-            logger.info(f"  Mixed (0.3 <= score <= 0.7): {mixed} ({100*mixed/len(scores):.1f}%)")
-            logger.info(f"  AI-like (score > 0.7): {ai_like} ({100*ai_like/len(scores):.1f}%)")
+        score_cache: Dict[str, float] = {}
+        with tqdm(total=len(unique_boxes), desc="Analyzing text") as progress:
+            for chunk, scores in zip(chunks, chunk_scores):
+                score_cache.update(zip((box.text for box in chunk), scores))
+                progress.update(len(chunk))
 
-        logger.info("="*60)
-        logger.info(f"\n✓ Success! Colorized PDF saved to: {args.output_pdf}")
-        logger.info("\nColor guide:")
-        logger.info("  🟢 Green = Likely human-written")
-        logger.info("  🟡 Yellow = Mixed/uncertain")
-        logger.info("  🔴 Red = Likely AI-generated")
-        logger.info("="*60)
+        for box in scorable_boxes:
+            box.score = score_cache[box.text]
+
+        # Step 7: Create colorized PDF
+        logger.info("\nCreating colorized PDF...")
+        processor.colorize_pdf(args.output_pdf, opacity=args.opacity)
 
-        return 0
+        return _finish(args, processor, boxes)
 
     except Exception as e:
         logger.error(f"Error processing PDF: {e}", exc_info=True)
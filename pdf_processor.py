@@ -4,19 +4,36 @@ and colorizing based on AI detection scores.
 """
 
 import fitz  # PyMuPDF
+import numpy as np
 from docling_parse.pdf_parser import DoclingPdfParser, PdfDocument
 from docling_core.types.doc.page import TextCellUnit
-from typing import List, Dict, Tuple, Optional
+from typing import BinaryIO, List, Dict, Tuple, Optional, Union, TYPE_CHECKING
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
 from pathlib import Path
 
+if TYPE_CHECKING:
+    from transformers import PreTrainedTokenizerBase
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Documents with fewer pages are extracted sequentially; a thread pool is not worth it
+MIN_PAGES_FOR_THREADS = 4
+
+# Where a PDF can be written: a file path or a binary file object
+OutputTarget = Union[str, "os.PathLike[str]", BinaryIO]
+
 
 class BoundingBox:
     """Represents a bounding box with text and coordinates."""
 
+    # Documents yield thousands of boxes; slots drop the per-instance __dict__
+    __slots__ = ("text", "rect", "page_no", "score", "input_ids")
+
     def __init__(self, text: str, rect: Tuple[float, float, float, float], page_no: int):
         """
         Initialize bounding box.
@@ -30,6 +47,7 @@ class BoundingBox:
         self.rect = rect  # (x0, y0, x1, y1)
         self.page_no = page_no
         self.score = 0.0  # AI detection score (0.0 to 1.0)
+        self.input_ids: Optional[List[int]] = None  # Token ids, filled by PDFProcessor.pretokenize
 
     def __repr__(self):
         return f"BoundingBox(page={self.page_no}, rect={self.rect}, text='{self.text[:30]}...', score={self.score:.2f})"
@@ -51,12 +69,19 @@ class PDFProcessor:
 
         self.bounding_boxes: List[BoundingBox] = []
 
-    def extract_text_with_boxes(self, unit_type: str = "line") -> List[BoundingBox]:
+    def extract_text_with_boxes(
+        self, unit_type: str = "line", max_workers: Optional[int] = None
+    ) -> List[BoundingBox]:
         """
         Extract text with bounding boxes from PDF using docling.
 
+        Pages are independent, so on larger documents they are extracted in
+        parallel by a thread pool, each thread using its own parser.
+
         Args:
             unit_type: Type of text unit to extract ("char", "word", or "line")
+            max_workers: Number of extraction threads (default: one per CPU,
+                or sequential for documents under MIN_PAGES_FOR_THREADS pages)
 
         Returns:
             List of BoundingBox objects
@@ -78,98 +103,167 @@ class PDFProcessor:
         # Parse PDF with docling
         parser = DoclingPdfParser()
         pdf_doc: PdfDocument = parser.load(path_or_stream=str(self.pdf_path))
+        page_numbers = range(1, pdf_doc.number_of_pages() + 1)
 
-        self.bounding_boxes = []
-
-        # Iterate over pages and extract text cells
-        for page_no, page in pdf_doc.iterate_pages():
-            logger.info(f"Processing page {page_no}")
-
-            for cell in page.iterate_cells(unit_type=unit):
-                # cell.rect is a BoundingRectangle object
-                # Try to get bbox property, otherwise calculate from corner coordinates
-                if hasattr(cell.rect, 'bbox'):
-                    bbox = cell.rect.bbox
-                else:
-                    # New API uses corner coordinates (r_x0, r_y0, r_x1, r_y1, r_x2, r_y2, r_x3, r_y3)
-                    # Calculate axis-aligned bounding box from corner coordinates
-                    bbox = (
-                        min(cell.rect.r_x0, cell.rect.r_x1, cell.rect.r_x2, cell.rect.r_x3),  # x0 (left)
-                        min(cell.rect.r_y0, cell.rect.r_y1, cell.rect.r_y2, cell.rect.r_y3),  # y0 (top)
-                        max(cell.rect.r_x0, cell.rect.r_x1, cell.rect.r_x2, cell.rect.r_x3),  # x1 (right)
-                        max(cell.rect.r_y0, cell.rect.r_y1, cell.rect.r_y2, cell.rect.r_y3)   # y1 (bottom)
-                    )
-
-                box = BoundingBox(
-                    text=cell.text,
-                    rect=bbox,
-                    page_no=page_no
-                )
-                self.bounding_boxes.append(box)
+        if max_workers is None:
+            max_workers = (os.cpu_count() or 1) if len(page_numbers) >= MIN_PAGES_FOR_THREADS else 1
+        max_workers = min(max_workers, len(page_numbers))
+
+        if max_workers <= 1:
+            page_boxes = [self._extract_page_boxes(pdf_doc, page_no, unit) for page_no in page_numbers]
+        else:
+            # A single docling document is not safe to share between threads,
+            # so every worker lazily loads its own
+            local = threading.local()
+
+            def extract_page(page_no: int) -> List[BoundingBox]:
+                if not hasattr(local, "pdf_doc"):
+                    local.pdf_doc = DoclingPdfParser().load(path_or_stream=str(self.pdf_path))
+                return self._extract_page_boxes(local.pdf_doc, page_no, unit)
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                page_boxes = list(executor.map(extract_page, page_numbers))
+
+        # executor.map preserves order, so boxes stay in page order
+        self.bounding_boxes = [box for boxes in page_boxes for box in boxes]
 
         logger.info(f"Extracted {len(self.bounding_boxes)} text boxes")
         return self.bounding_boxes
 
+    def _extract_page_boxes(
+        self, pdf_doc: PdfDocument, page_no: int, unit: TextCellUnit
+    ) -> List[BoundingBox]:
+        """Extract the text cells of one page (1-indexed) as bounding boxes."""
+        logger.info(f"Processing page {page_no}")
+        page = pdf_doc.get_page(page_no)
+
+        boxes = []
+        for cell in page.iterate_cells(unit_type=unit):
+            # cell.rect is a BoundingRectangle object
+            # Try to get bbox property, otherwise calculate from corner coordinates
+            if hasattr(cell.rect, 'bbox'):
+                bbox = cell.rect.bbox
+            else:
+                # New API uses corner coordinates (r_x0, r_y0, r_x1, r_y1, r_x2, r_y2, r_x3, r_y3)
+                # Calculate axis-aligned bounding box from corner coordinates
+                bbox = (
+                    min(cell.rect.r_x0, cell.rect.r_x1, cell.rect.r_x2, cell.rect.r_x3),  # x0 (left)
+                    min(cell.rect.r_y0, cell.rect.r_y1, cell.rect.r_y2, cell.rect.r_y3),  # y0 (top)
+                    max(cell.rect.r_x0, cell.rect.r_x1, cell.rect.r_x2, cell.rect.r_x3),  # x1 (right)
+                    max(cell.rect.r_y0, cell.rect.r_y1, cell.rect.r_y2, cell.rect.r_y3)   # y1 (bottom)
+                )
+
+            box = BoundingBox(
+                text=cell.text,
+                rect=bbox,
+                page_no=page_no
+            )
+            boxes.append(box)
+
+        return boxes
+
+    def _box_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the rects (N, 4) and page numbers (N,) of the current boxes.
+
+        The arrays are built from bounding_boxes on every call, so edits made
+        to the list in place are always picked up. Merging relies on boxes
+        being grouped by page, so if they are not, bounding_boxes is
+        stable-sorted by page number in place first, keeping the reading
+        order within each page.
+        """
+        boxes = self.bounding_boxes
+        page_nos = np.fromiter((box.page_no for box in boxes), dtype=np.int64, count=len(boxes))
+
+        if np.any(page_nos[1:] < page_nos[:-1]):
+            order = np.argsort(page_nos, kind="stable")
+            boxes[:] = [boxes[i] for i in order.tolist()]
+            page_nos = page_nos[order]
+
+        rects = np.array([box.rect for box in boxes], dtype=np.float64).reshape(-1, 4)
+        return rects, page_nos
+
     def merge_boxes_into_segments(self, max_boxes_per_segment: int = 10) -> List[BoundingBox]:
         """
         Merge nearby bounding boxes into larger text segments for better AI detection.
         This is useful because AI detectors work better on longer text.
 
+        The merged segments replace bounding_boxes, so colorize_pdf draws them.
+
         Args:
             max_boxes_per_segment: Maximum number of boxes to merge into one segment
 
         Returns:
-            List of merged BoundingBox objects
+            List of merged BoundingBox objects (the new bounding_boxes)
         """
         if not self.bounding_boxes:
-            return []
-
-        merged_boxes = []
-        current_page = self.bounding_boxes[0].page_no
-        current_segment_boxes = []
-
-        for box in self.bounding_boxes:
-            # Start a new segment if page changes or we have enough boxes
-            if box.page_no != current_page or len(current_segment_boxes) >= max_boxes_per_segment:
-                if current_segment_boxes:
-                    # Merge current segment
-                    merged_box = self._merge_boxes(current_segment_boxes)
-                    merged_boxes.append(merged_box)
-
-                current_segment_boxes = [box]
-                current_page = box.page_no
-            else:
-                current_segment_boxes.append(box)
-
-        # Don't forget the last segment
-        if current_segment_boxes:
-            merged_box = self._merge_boxes(current_segment_boxes)
-            merged_boxes.append(merged_box)
+            return self.bounding_boxes
+
+        rects, page_nos = self._box_arrays()
+        n = len(page_nos)
+
+        # Boxes are sorted by page, so each page is one run; a segment starts
+        # at every page change and every max_boxes_per_segment boxes into a run
+        page_changes = np.r_[True, page_nos[1:] != page_nos[:-1]]
+        run_starts = np.flatnonzero(page_changes)
+        run_ids = np.cumsum(page_changes) - 1
+        position_in_run = np.arange(n) - run_starts[run_ids]
+        starts = np.flatnonzero(position_in_run % max_boxes_per_segment == 0)
+        ends = np.r_[starts[1:], n]
+
+        # Rectangle encompassing each segment, reduced over all segments at once
+        top_left = np.minimum.reduceat(rects[:, :2], starts, axis=0)
+        bottom_right = np.maximum.reduceat(rects[:, 2:], starts, axis=0)
+        merged_rects = np.hstack((top_left, bottom_right)).tolist()
+
+        merged_boxes = [
+            BoundingBox(
+                text=" ".join(box.text for box in self.bounding_boxes[start:end]),
+                rect=tuple(rect),
+                page_no=int(page_nos[start])
+            )
+            for start, end, rect in zip(starts.tolist(), ends.tolist(), merged_rects)
+        ]
 
         logger.info(f"Merged {len(self.bounding_boxes)} boxes into {len(merged_boxes)} segments")
-        return merged_boxes
+        self.bounding_boxes = merged_boxes
+        return self.bounding_boxes
 
-    def _merge_boxes(self, boxes: List[BoundingBox]) -> BoundingBox:
-        """Merge multiple boxes into one."""
-        if not boxes:
-            raise ValueError("Cannot merge empty list of boxes")
+    def pretokenize(
+        self,
+        tokenizer: "PreTrainedTokenizerBase",
+        max_length: int = 512,
+        boxes: Optional[List[BoundingBox]] = None,
+    ) -> None:
+        """
+        Tokenize the text of bounding boxes once, storing the ids on box.input_ids.
 
-        # Combine text with spaces
-        combined_text = " ".join(box.text for box in boxes)
+        Detectors can then score the boxes with score_token_ids, keeping the
+        tokenizer out of the scoring loop.
 
-        # Calculate bounding rectangle that encompasses all boxes
-        x0 = min(box.rect[0] for box in boxes)
-        y0 = min(box.rect[1] for box in boxes)
-        x1 = max(box.rect[2] for box in boxes)
-        y1 = max(box.rect[3] for box in boxes)
+        Args:
+            tokenizer: Tokenizer of the detector's scoring model
+            max_length: Maximum number of tokens kept per box
+            boxes: Boxes to tokenize, e.g. only those that will be scored
+                (default: all bounding boxes)
+        """
+        if boxes is None:
+            boxes = self.bounding_boxes
+        if not boxes:
+            return
 
-        return BoundingBox(
-            text=combined_text,
-            rect=(x0, y0, x1, y1),
-            page_no=boxes[0].page_no
-        )
+        encoded = tokenizer(
+            [box.text for box in boxes],
+            truncation=True,
+            max_length=max_length,
+            return_attention_mask=False,
+        )["input_ids"]
+
+        for box, input_ids in zip(boxes, encoded):
+            box.input_ids = input_ids
 
-    def score_to_color(self, score: float) -> Tuple[float, float, float]:
+    @staticmethod
+    def score_to_color(score: float) -> Tuple[float, float, float]:
         """
         Convert AI detection score to RGB color.
         Low score (human-written) = green
@@ -196,72 +290,111 @@ class PDFProcessor:
 
         return (r, g, b)
 
-    def colorize_pdf(self, output_path: str, opacity: float = 0.3) -> None:
+    @staticmethod
+    def scores_to_colors(scores: np.ndarray) -> np.ndarray:
+        """
+        Vectorized score_to_color: convert many scores to RGB colors at once.
+
+        Args:
+            scores: Array of N scores between 0.0 and 1.0
+
+        Returns:
+            Array of shape (N, 3) with RGB values between 0.0 and 1.0
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        colors = np.zeros((len(scores), 3))
+        colors[:, 0] = np.where(scores < 0.5, scores * 2, 1.0)
+        colors[:, 1] = np.where(scores < 0.5, 1.0, 2.0 * (1.0 - scores))
+        return colors
+
+    def colorize_pdf(self, output_path: OutputTarget, opacity: float = 0.3) -> None:
         """
         Create a new PDF with colorized bounding boxes based on AI detection scores.
 
         Args:
-            output_path: Path for the output PDF
-            opacity: Opacity of the colored boxes (0.0 to 1.0)
+            output_path: Path for the output PDF, or a binary file object
+                open for writing
+            opacity: Opacity of the colored boxes (0.0 to 1.0); at 0.0 no
+                boxes are drawn and the output is a plain copy
         """
         logger.info(f"Colorizing PDF and saving to {output_path}")
 
-        # Open PDF with PyMuPDF
-        doc = fitz.open(self.pdf_path)
-
-        # Draw colored rectangles for each bounding box
-        for box in self.bounding_boxes:
-            # Convert from docling's 1-based page numbering to PyMuPDF's 0-based indexing
-            page_index = box.page_no - 1
-
-            if page_index >= len(doc) or page_index < 0:
-                logger.warning(f"Page {box.page_no} out of range, skipping")
-                continue
-
-            page = doc[page_index]
-
-            # Get color based on score
-            color = self.score_to_color(box.score)
-
-            # Transform coordinates if page has a Y-axis flip transformation
-            # Check the transformation matrix for Y-axis flip: Matrix(1, 0, 0, -1, 0, height)
-            matrix = page.transformation_matrix
-            x0, y0, x1, y1 = box.rect
-
-            if matrix.d == -1.0:
-                # Y-axis is flipped; transform coordinates
-                # matrix.f contains the translation (page height)
-                page_height = matrix.f
-                # For a rect in bottom-left origin (x0, y0_bottom, x1, y1_top),
-                # transform to flipped space: (x0, height - y1_top, x1, height - y0_bottom)
-                y0_new = page_height - y1
-                y1_new = page_height - y0
-                rect = fitz.Rect(x0, y0_new, x1, y1_new)
+        # Fully transparent boxes would be invisible, so only copy the source
+        boxes = self.bounding_boxes if opacity > 0.0 else []
+
+        # Compute every box color up front
+        scores = np.fromiter((box.score for box in boxes), dtype=np.float64, count=len(boxes))
+        colors = self.scores_to_colors(scores).tolist()
+
+        # The source is opened per call, so overlays never carry over between calls
+        with fitz.open(self.pdf_path) as doc:
+            # Draw page by page so each page is looked up once and its rectangles
+            # are written with a single Shape commit. This appends one content
+            # stream per page; per-box rect annotations each need their own object
+            # and appearance stream, and make the output several times larger.
+            order = sorted(range(len(boxes)), key=lambda i: boxes[i].page_no)
+            for page_no, indices in groupby(order, key=lambda i: boxes[i].page_no):
+                # Convert from docling's 1-based page numbering to PyMuPDF's 0-based indexing
+                page_index = page_no - 1
+
+                if page_index >= len(doc) or page_index < 0:
+                    logger.warning(f"Page {page_no} out of range, skipping")
+                    continue
+
+                page = doc[page_index]
+                shape = page.new_shape()
+
+                # Transform coordinates if page has a Y-axis flip transformation
+                # Check the transformation matrix for Y-axis flip: Matrix(1, 0, 0, -1, 0, height)
+                matrix = page.transformation_matrix
+
+                for i in indices:
+                    x0, y0, x1, y1 = boxes[i].rect
+
+                    if matrix.d == -1.0:
+                        # Y-axis is flipped; transform coordinates
+                        # matrix.f contains the translation (page height)
+                        page_height = matrix.f
+                        # For a rect in bottom-left origin (x0, y0_bottom, x1, y1_top),
+                        # transform to flipped space: (x0, height - y1_top, x1, height - y0_bottom)
+                        y0_new = page_height - y1
+                        y1_new = page_height - y0
+                        rect = fitz.Rect(x0, y0_new, x1, y1_new)
+                    else:
+                        # No transformation needed
+                        rect = fitz.Rect(x0, y0, x1, y1)
+
+                    # Filled rectangle with transparency
+                    shape.draw_rect(rect)
+                    shape.finish(color=colors[i], fill=colors[i], fill_opacity=opacity)
+
+                shape.commit(overlay=True)
+
+            # Save the modified PDF
+            if (
+                isinstance(output_path, (str, os.PathLike))
+                and Path(output_path).resolve() == self.pdf_path.resolve()
+                and doc.can_save_incrementally()
+            ):
+                # Writing back over the input: append only the changed objects
+                doc.saveIncr()
             else:
-                # No transformation needed
-                rect = fitz.Rect(box.rect)
-
-            # Draw filled rectangle with transparency
-            page.draw_rect(
-                rect,
-                color=color,
-                fill=color,
-                overlay=True,
-                fill_opacity=opacity,
-            )
-
-        # Save the modified PDF
-        doc.save(output_path)
-        doc.close()
+                # Drop unused objects and compress streams to keep the output small
+                doc.save(output_path, garbage=4, deflate=True, deflate_images=True, clean=True)
 
         logger.info(f"Saved colorized PDF to {output_path}")
 
-    def create_visualization_legend(self, output_path: str) -> None:
+    @classmethod
+    def create_visualization_legend(cls, output_path: OutputTarget) -> None:
         """
         Create a simple legend page showing the color scale.
 
+        The legend does not depend on any document, so this can also be
+        called on the class itself.
+
         Args:
-            output_path: Path for the legend PDF
+            output_path: Path for the legend PDF, or a binary file object
+                open for writing
         """
         # Create a new PDF with a legend
         doc = fitz.open()
@@ -280,7 +413,7 @@ class PDFProcessor:
         y_pos = 50
         for i in range(11):
             score = i / 10.0
-            color = self.score_to_color(score)
+            color = cls.score_to_color(score)
             rect = fitz.Rect(20, y_pos + i * 10, 100, y_pos + (i + 1) * 10)
             page.draw_rect(rect, color=color, fill=color)
 
@@ -4,27 +4,391 @@ Pytest configuration and fixtures for PDF AI detection tests.
 Provides fixtures for generating test PDFs and managing output directories.
 """
 
+import contextlib
+import csv
+import hashlib
+import html
+import inspect
+import io
+import os
+import shutil
+import time
 import pytest
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
 from pathlib import Path
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_LEFT
+from typing import Sequence
+
+from filelock import FileLock
+
+_TESTS_DIR = Path(__file__).parent
+
+# Generated PDFs for human verification
+_OUTPUTS_DIR = _TESTS_DIR / "outputs"
+_OUTPUTS_DIR.mkdir(exist_ok=True)
+
+# With PDFAI_HF_TMPFS=1, Hugging Face downloads are cached in shared memory,
+# so every pytest-xdist worker loads the test model from RAM. This has to
+# happen before huggingface_hub is imported, as it reads HF_HOME only once.
+_HF_TMPFS = Path("/dev/shm/hf_cache")
+if os.environ.get("PDFAI_HF_TMPFS") == "1" and _HF_TMPFS.parent.is_dir():
+    os.environ.setdefault("HF_HOME", str(_HF_TMPFS))
+
+# Model used by the detector fixtures
+_TEST_MODEL = "gpt2"
+
+# With PDFAI_PROFILE=1, time spent in each pipeline phase is written to tests/outputs
+_PROFILE = os.environ.get("PDFAI_PROFILE") == "1"
+_timings = []
+
+
+@contextlib.contextmanager
+def _phase(name: str):
+    """Record the wall time of the enclosed block under name, with the running test."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        test = os.environ.get("PYTEST_CURRENT_TEST", "").rsplit(" ", 1)[0]
+        _timings.append((name, test, time.perf_counter() - start))
+
+
+def _timed(name: str, func):
+    """Wrap func so that every call is recorded as phase name."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with _phase(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# reportlab is a heavy import, so it is only loaded once a PDF is actually built
+@lru_cache(maxsize=None)
+def _paragraph_styles() -> dict:
+    """
+    Build the paragraph styles used by the generated PDFs.
+
+    Built on first use and shared by every PDF afterwards.
+    """
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_LEFT
+    from reportlab.lib import colors
+
+    styles = getSampleStyleSheet()
+    return {
+        "body": ParagraphStyle(
+            'CustomBody',
+            parent=styles['BodyText'],
+            fontSize=12,
+            leading=16,
+            spaceAfter=12,
+            alignment=TA_LEFT,
+        ),
+        # Styles used by the verification PDF
+        "verif_title": ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#1a1a1a'),
+            spaceAfter=30,
+            alignment=TA_LEFT,
+        ),
+        "heading": ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=16,
+            textColor=colors.HexColor('#333333'),
+            spaceAfter=20,
+            spaceBefore=20,
+            alignment=TA_LEFT,
+        ),
+        "subheading": ParagraphStyle(
+            'CustomSubheading',
+            parent=styles['Heading3'],
+            fontSize=14,
+            textColor=colors.HexColor('#555555'),
+            spaceAfter=12,
+            spaceBefore=12,
+            alignment=TA_LEFT,
+        ),
+    }
+
+
+@lru_cache(maxsize=None)
+def _ai_table_style():
+    """Build the style of the comparison table in the verification PDF, once."""
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ])
+
+
+@lru_cache(maxsize=None)
+def _plain_text_flowable():
+    """
+    Build a flowable class for paragraphs of plain text, once.
+
+    Paragraph runs every text through reportlab's markup parser. Sample and
+    Wikipedia paragraphs carry no markup, so this flowable only wraps the
+    text with simpleSplit and draws the lines directly, like _generate_pdf.
+    The text is drawn verbatim, so it needs no escaping either.
+    """
+    from reportlab.lib.utils import simpleSplit
+    from reportlab.platypus import Flowable
+
+    class PlainText(Flowable):
+        def __init__(self, text, style):
+            super().__init__()
+            self.text = text
+            self.style = style
+            self.lines = []
+
+        def _split_lines(self, avail_width):
+            style = self.style
+            return simpleSplit(self.text, style.fontName, style.fontSize, avail_width)
+
+        def wrap(self, avail_width, avail_height):
+            self.lines = self._split_lines(avail_width)
+            self.width = avail_width
+            self.height = len(self.lines) * self.style.leading
+            return self.width, self.height
+
+        def split(self, avail_width, avail_height):
+            lines = self._split_lines(avail_width)
+            fitting = int(avail_height // self.style.leading)
+            if fitting <= 0 or fitting >= len(lines):
+                return []
+            return [
+                PlainText(" ".join(lines[:fitting]), self.style),
+                PlainText(" ".join(lines[fitting:]), self.style),
+            ]
+
+        def getSpaceBefore(self):
+            return self.style.spaceBefore
+
+        def getSpaceAfter(self):
+            return self.style.spaceAfter
+
+        def draw(self):
+            style = self.style
+            text = self.canv.beginText(0, self.height - style.fontSize)
+            text.setFont(style.fontName, style.fontSize, style.leading)
+            text.setFillColor(style.textColor)
+            text.textLines(self.lines)
+            self.canv.drawText(text)
+
+    return PlainText
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--visual",
+        action="store_true",
+        default=False,
+        help="build the verification PDF in tests/outputs and run the tests that use it",
+    )
+
+
+def pytest_configure(config):
+    # Registered here as well so the marks don't warn when pytest-xdist is missing
+    config.addinivalue_line(
+        "markers", "xdist_group(name): run all tests of a group on one pytest-xdist worker"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    # The verification PDF is only for looking at, so routine runs skip it
+    if config.getoption("--visual"):
+        return
+    skip = pytest.mark.skip(reason="visual outputs disabled (use --visual)")
+    for item in items:
+        if "verification_test_pdf" in getattr(item, "fixturenames", ()):
+            item.add_marker(skip)
+
+
+# Where test_outputs_dir put this session's outputs, if in a temporary directory
+_TMP_OUTPUTS_KEY = pytest.StashKey[Path]()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    # Outputs normally live in a temporary directory; keep them when a test fails
+    outcome = yield
+    report = outcome.get_result()
+    if report.when != "call" or not report.failed:
+        return
+    outputs_dir = item.config.stash.get(_TMP_OUTPUTS_KEY, None)
+    if outputs_dir is not None and "test_outputs_dir" in getattr(item, "fixturenames", ()):
+        shutil.copytree(outputs_dir, _OUTPUTS_DIR / f"failed_{item.name}", dirs_exist_ok=True)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _PROFILE or not _timings:
+        return
+    # Each pytest-xdist worker writes its own file
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    timings_path = _OUTPUTS_DIR / (f"timings.{worker}.csv" if worker else "timings.csv")
+    with open(timings_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["phase", "test", "seconds"])
+        writer.writerows((name, test, f"{seconds:.6f}") for name, test, seconds in _timings)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _profile_phases():
+    """Time PDF extraction, colorizing and legend building when PDFAI_PROFILE=1."""
+    if not _PROFILE:
+        yield
+        return
+    from pdf_processor import PDFProcessor
+
+    legend = inspect.getattr_static(PDFProcessor, "create_visualization_legend")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(PDFProcessor, "extract_text_with_boxes", _timed("extract", PDFProcessor.extract_text_with_boxes))
+        mp.setattr(PDFProcessor, "colorize_pdf", _timed("colorize", PDFProcessor.colorize_pdf))
+        mp.setattr(PDFProcessor, "create_visualization_legend", classmethod(_timed("legend", legend.__func__)))
+        yield
+
+
+@lru_cache(maxsize=256)
+def _clean(text: str) -> str:
+    """Collapse runs of whitespace; the same sample texts are cleaned by many fixtures."""
+    return ' '.join(text.split())
 
 
 @pytest.fixture(scope="session")
-def test_outputs_dir():
+def test_outputs_dir(tmp_path_factory, pytestconfig):
     """
-    Create and return the test outputs directory.
-    This directory is used to store generated PDFs for human verification.
+    Return the directory that tests write their output PDFs to.
+
+    Outputs go to tests/outputs for human verification with
+    PDFAI_KEEP_OUTPUTS=1 or --visual. Otherwise they go to a temporary
+    directory, which is copied to tests/outputs/failed_<test> when a test fails.
     """
-    outputs_dir = Path(__file__).parent / "outputs"
-    outputs_dir.mkdir(exist_ok=True)
+    if os.environ.get("PDFAI_KEEP_OUTPUTS") == "1" or pytestconfig.getoption("--visual"):
+        return _OUTPUTS_DIR
+    outputs_dir = tmp_path_factory.mktemp("pdfai")
+    pytestconfig.stash[_TMP_OUTPUTS_KEY] = outputs_dir
     return outputs_dir
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
+def session_legend(test_outputs_dir):
+    """
+    Build the color legend PDF once per session and return its path.
+
+    The legend only depends on the fixed score-to-color mapping, so every
+    test can share one copy. It is built even if tests/outputs already holds
+    a legend from an earlier run, so that a stale file is never tested.
+    """
+    from pdf_processor import PDFProcessor
+
+    legend_path = test_outputs_dir / "legend.pdf"
+    # Write under a private name first; xdist workers may share the directory
+    partial_path = legend_path.with_name(f".legend.{os.getpid()}.pdf")
+    PDFProcessor.create_visualization_legend(str(partial_path))
+    partial_path.replace(legend_path)
+    return legend_path
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _prefetch_model():
+    """
+    Download the test model into the tmpfs cache once, when PDFAI_HF_TMPFS=1.
+
+    The first worker to get here fetches the files while the others wait,
+    so none of them download the same weights at the same time.
+    """
+    if os.environ.get("HF_HOME") != str(_HF_TMPFS) or Path(_TEST_MODEL).is_dir() or _offline():
+        return
+    from huggingface_hub import snapshot_download
+
+    _HF_TMPFS.mkdir(parents=True, exist_ok=True)
+    with FileLock(str(_HF_TMPFS / ".prefetch.lock")):
+        try:
+            snapshot_download(_TEST_MODEL, allow_patterns=["*.json", "*.txt", "*.safetensors"])
+        except Exception:
+            pass  # The detector fixtures download on first use instead
+
+
+def _profile_scoring(detector):
+    """Time a detector's scoring calls as the score phase when PDFAI_PROFILE=1."""
+    if _PROFILE:
+        detector.score_text = _timed("score", detector.score_text)
+        detector.score_token_ids = _timed("score", detector.score_token_ids)
+    return detector
+
+
+@pytest.fixture(scope="session")
+def simple_detector():
+    """SimpleAIDetector on gpt2, loaded once and shared by every test."""
+    from ai_detector import SimpleAIDetector
+
+    return _profile_scoring(SimpleAIDetector(model_name=_TEST_MODEL))
+
+
+@pytest.fixture(scope="session")
+def fastdetect_detector():
+    """FastDetectGPTDetector on gpt2, loaded once and shared by every test."""
+    from ai_detector import FastDetectGPTDetector
+
+    return _profile_scoring(FastDetectGPTDetector(scoring_model_name=_TEST_MODEL))
+
+
+def _generate_pdf(output_path: Path, content: Sequence[str], title: str = "Test Document"):
+    """Generate a PDF with the specified content."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.lib.utils import simpleSplit
+    from reportlab.pdfgen import canvas
+
+    # Plain paragraphs need no flowable layout, so lines are drawn directly
+    # on the canvas, which is much faster than building a Platypus document
+    page_width, page_height = letter
+    left, right, top, bottom = 72, 72, 72, 18
+    text_width = page_width - left - right
+
+    # Render into memory and write the file in one go
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    y = page_height - top
+
+    def draw_paragraph(text: str, font: str, size: float, leading: float, space_after: float):
+        nonlocal y
+        c.setFont(font, size)
+        for line in simpleSplit(text, font, size, text_width):
+            if y - leading < bottom:
+                c.showPage()
+                c.setFont(font, size)
+                y = page_height - top
+            y -= leading
+            c.drawString(left, y, line)
+        y -= space_after
+
+    # Add title, followed by its spacing and a spacer
+    draw_paragraph(title, "Helvetica-Bold", 24, 28.8, 30 + 0.2 * inch)
+
+    # Add content paragraphs
+    for text in content:
+        # Clean up the text (remove extra whitespace)
+        draw_paragraph(_clean(text), "Helvetica", 12, 16, 12 + 0.1 * inch)
+
+    c.save()
+    Path(output_path).write_bytes(buffer.getvalue())
+
+    return output_path
+
+
+@pytest.fixture(scope="session")
 def pdf_generator():
     """
     Provides a function to generate test PDFs with custom content.
@@ -34,96 +398,51 @@ def pdf_generator():
         - content: List of text strings (each becomes a paragraph)
         - title: Optional title for the PDF
     """
-    def generate_pdf(output_path: Path, content: list, title: str = "Test Document"):
-        """Generate a PDF with the specified content."""
-        doc = SimpleDocTemplate(
-            str(output_path),
-            pagesize=letter,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=18,
-        )
-
-        # Container for the 'Flowable' objects
-        elements = []
-
-        # Get standard styles
-        styles = getSampleStyleSheet()
-
-        # Create custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor='black',
-            spaceAfter=30,
-            alignment=TA_LEFT,
-        )
+    return _generate_pdf
 
-        body_style = ParagraphStyle(
-            'CustomBody',
-            parent=styles['BodyText'],
-            fontSize=12,
-            leading=16,
-            spaceAfter=12,
-            alignment=TA_LEFT,
-        )
-
-        # Add title
-        elements.append(Paragraph(title, title_style))
-        elements.append(Spacer(1, 0.2 * inch))
 
-        # Add content paragraphs
-        for text in content:
-            # Clean up the text (remove extra whitespace)
-            clean_text = ' '.join(text.split())
-            elements.append(Paragraph(clean_text, body_style))
-            elements.append(Spacer(1, 0.1 * inch))
-
-        # Build PDF
-        doc.build(elements)
-
-        return output_path
+def _link_into(src: Path, dst_dir: Path) -> Path:
+    """
+    Hardlink a session-built PDF into a test's directory, copying if links are unsupported.
 
-    return generate_pdf
+    The link shares its bytes with the session copy, so tests must write their
+    outputs elsewhere rather than modifying the input in place.
+    """
+    dst = dst_dir / src.name
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
 
 
-@pytest.fixture
-def simple_human_pdf(pdf_generator, test_outputs_dir, tmp_path):
-    """Generate a PDF with human-written text."""
+def _build_human_pdf(output_path: Path) -> None:
+    """Build a PDF with human-written text."""
     from tests.fixtures.sample_texts import HUMAN_TEXT_SHORT
 
-    output_path = tmp_path / "input_human_text.pdf"
-    pdf_generator(
+    _generate_pdf(
         output_path,
         [HUMAN_TEXT_SHORT],
         title="Human-Written Text Sample"
     )
-    return output_path
 
 
-@pytest.fixture
-def simple_ai_pdf(pdf_generator, test_outputs_dir, tmp_path):
-    """Generate a PDF with AI-generated text."""
+def _build_ai_pdf(output_path: Path) -> None:
+    """Build a PDF with AI-generated text."""
     from tests.fixtures.sample_texts import AI_TEXT_SHORT
 
-    output_path = tmp_path / "input_ai_text.pdf"
-    pdf_generator(
+    _generate_pdf(
         output_path,
         [AI_TEXT_SHORT],
         title="AI-Generated Text Sample"
     )
-    return output_path
 
 
-@pytest.fixture
-def mixed_content_pdf(pdf_generator, test_outputs_dir, tmp_path):
-    """Generate a PDF with mixed human and AI content."""
+def _build_mixed_content_pdf(output_path: Path) -> None:
+    """Build a PDF with mixed human and AI content."""
     from tests.fixtures.sample_texts import HUMAN_TEXT_LONG, AI_TEXT_LONG, MIXED_TEXT
 
-    output_path = tmp_path / "input_mixed_content.pdf"
-    pdf_generator(
+    _generate_pdf(
         output_path,
         [
             "Section 1: Human-Written Content",
@@ -135,12 +454,10 @@ def mixed_content_pdf(pdf_generator, test_outputs_dir, tmp_path):
         ],
         title="Mixed Content Sample"
     )
-    return output_path
 
 
-@pytest.fixture
-def multi_page_pdf(pdf_generator, test_outputs_dir, tmp_path):
-    """Generate a multi-page PDF with varied content."""
+def _build_multi_page_pdf(output_path: Path) -> None:
+    """Build a multi-page PDF with varied content."""
     from tests.fixtures.sample_texts import (
         HUMAN_TEXT_SHORT,
         AI_TEXT_SHORT,
@@ -148,10 +465,8 @@ def multi_page_pdf(pdf_generator, test_outputs_dir, tmp_path):
         AI_TEXT_LONG,
     )
 
-    output_path = tmp_path / "input_multi_page.pdf"
-
     # Create longer content to span multiple pages
-    content = [
+    content = (
         "Page 1: Introduction",
         HUMAN_TEXT_SHORT,
         HUMAN_TEXT_LONG,
@@ -162,29 +477,95 @@ def multi_page_pdf(pdf_generator, test_outputs_dir, tmp_path):
         HUMAN_TEXT_LONG,
         "Page 4: Conclusion",
         AI_TEXT_SHORT,
-    ]
+    )
 
-    pdf_generator(
+    _generate_pdf(
         output_path,
         content,
         title="Multi-Page Test Document"
     )
-    return output_path
 
 
+# Fallback: Use a Wikipedia excerpt about Leonardo da Vinci
+_FALLBACK_TITLE = "Leonardo da Vinci (Wikipedia)"
+_FALLBACK_PARAS = (
+    """Leonardo di ser Piero da Vinci (15 April 1452 – 2 May 1519) was an Italian
+    polymath of the High Renaissance who was active as a painter, draughtsman, engineer,
+    scientist, theorist, sculptor, and architect. While his fame initially rested on his
+    achievements as a painter, he also became known for his notebooks, in which he made
+    drawings and notes on a variety of subjects, including anatomy, astronomy, botany,
+    cartography, painting, and paleontology.""",
+
+    """Leonardo is widely regarded as one of the greatest painters of all time and perhaps
+    the most diversely talented person ever to have lived. His innovative approaches to art
+    and science influenced the development of Western art for centuries. The Mona Lisa and
+    The Last Supper are among the most famous, reproduced, and parodied works of art in history.""",
+
+    """Born out of wedlock to a successful notary and a lower-class woman in Vinci,
+    Leonardo was educated in Florence by the Italian painter and sculptor Andrea del Verrocchio.
+    He began his career in the city, but then spent much time in the service of Ludovico Sforza
+    in Milan. Later, he worked in Florence and Milan again, as well as briefly in Rome, all
+    while attracting a large following of imitators and students.""",
+)
+
+
+def _offline() -> bool:
+    """
+    Whether network fetches should be skipped.
+
+    Set by PYTEST_OFFLINE (or OFFLINE) to anything but "0"; defaults to on
+    when running under CI.
+    """
+    default = "1" if os.environ.get("CI") else ""
+    flag = os.environ.get("PYTEST_OFFLINE", os.environ.get("OFFLINE", default))
+    return flag not in ("", "0")
+
+
+# On-disk HTTP cache for the Wikipedia fetch (requests-cache adds the .sqlite suffix)
+_WIKI_CACHE = _TESTS_DIR / ".wiki_cache"
+
+
+@lru_cache(maxsize=1)
+def _http_session():
+    """
+    Return the HTTP session shared by every fetch of test content.
+
+    Responses are cached on disk for a day when requests-cache is installed,
+    otherwise a plain requests session is used. Either way the connection is
+    kept alive between requests and a failed request is retried once.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    try:
+        from requests_cache import CachedSession
+    except ImportError:
+        session = requests.Session()
+    else:
+        session = CachedSession(str(_WIKI_CACHE), expire_after=86400)
+    session.headers["User-Agent"] = "pdf-ai-detect-tests/1.0"
+    session.mount("https://", HTTPAdapter(max_retries=Retry(total=1, backoff_factor=0.1)))
+    return session
+
+
+@lru_cache(maxsize=1)
 def fetch_wikipedia_content():
     """
     Fetch random Wikipedia article content for use as human-generated text.
 
     Returns a tuple of (title, paragraphs_list).
     Falls back to hardcoded Wikipedia excerpt if API fails.
+    The result is cached, so the network is hit at most once per session.
+    With PYTEST_OFFLINE set, the fallback is returned without any request.
     """
-    try:
-        import requests
+    if _offline():
+        return _FALLBACK_TITLE, list(_FALLBACK_PARAS)
 
-        # Get a random Wikipedia article
+    try:
+        # Get a random Wikipedia article; with the disk cache any cached one will do
         random_url = "https://en.wikipedia.org/api/rest_v1/page/random/summary"
-        response = requests.get(random_url, timeout=5)
+        response = _http_session().get(random_url, timeout=2)
 
         if response.status_code == 200:
             data = response.json()
@@ -199,59 +580,79 @@ def fetch_wikipedia_content():
     except Exception:
         pass  # Fall back to hardcoded content
 
-    # Fallback: Use a Wikipedia excerpt about Leonardo da Vinci
-    title = "Leonardo da Vinci (Wikipedia)"
-    paragraphs = [
-        """Leonardo di ser Piero da Vinci (15 April 1452 – 2 May 1519) was an Italian
-        polymath of the High Renaissance who was active as a painter, draughtsman, engineer,
-        scientist, theorist, sculptor, and architect. While his fame initially rested on his
-        achievements as a painter, he also became known for his notebooks, in which he made
-        drawings and notes on a variety of subjects, including anatomy, astronomy, botany,
-        cartography, painting, and paleontology.""",
-
-        """Leonardo is widely regarded as one of the greatest painters of all time and perhaps
-        the most diversely talented person ever to have lived. His innovative approaches to art
-        and science influenced the development of Western art for centuries. The Mona Lisa and
-        The Last Supper are among the most famous, reproduced, and parodied works of art in history.""",
-
-        """Born out of wedlock to a successful notary and a lower-class woman in Vinci,
-        Leonardo was educated in Florence by the Italian painter and sculptor Andrea del Verrocchio.
-        He began his career in the city, but then spent much time in the service of Ludovico Sforza
-        in Milan. Later, he worked in Florence and Milan again, as well as briefly in Rome, all
-        while attracting a large following of imitators and students."""
-    ]
+    return _FALLBACK_TITLE, list(_FALLBACK_PARAS)
 
-    return title, paragraphs
 
+# Last verification PDF kept for human review, with the hash of its inputs alongside
+_VERIFICATION_PDF = _OUTPUTS_DIR / "input.pdf"
+_VERIFICATION_HASH = _VERIFICATION_PDF.with_name("input.pdf.sha256")
 
-@pytest.fixture
-def verification_test_pdf(test_outputs_dir):
+
+def _verification_key() -> str:
     """
-    Generate a comprehensive test PDF for verifying bounding box placement.
+    Hash everything the verification PDF is built from.
 
-    This fixture creates a 4-page PDF with:
+    Covers the Wikipedia content, the sample texts, the source of the
+    builder and of the helpers it lays pages out with, and the reportlab
+    version, so editing the layout also invalidates the kept PDF.
+    """
+    import reportlab
+    from tests.fixtures.sample_texts import AI_TEXT_LONG_PARAGRAPHS, SHORT_SNIPPETS
+
+    wiki_title, wiki_paragraphs = fetch_wikipedia_content()
+    inputs = (
+        wiki_title,
+        tuple(wiki_paragraphs),
+        AI_TEXT_LONG_PARAGRAPHS,
+        SHORT_SNIPPETS,
+        reportlab.Version,
+        *(
+            inspect.getsource(builder)
+            for builder in (_build_verification_pdf, _paragraph_styles, _plain_text_flowable, _ai_table_style, _clean)
+        ),
+    )
+    return hashlib.sha256(repr(inputs).encode()).hexdigest()
+
+
+def _verification_pdf_is_current(key: str) -> bool:
+    """Whether the kept verification PDF was built from inputs hashing to key."""
+    try:
+        return _VERIFICATION_PDF.exists() and _VERIFICATION_HASH.read_text(errors="ignore") == key
+    except OSError:
+        return False
+
+
+def _build_verification_pdf(output_path: Path) -> None:
+    """
+    Build a comprehensive test PDF for verifying bounding box placement.
+
+    The PDF has 4 pages:
     - Page 1: Wikipedia content (human-written) with varied layouts
     - Page 2: AI-generated content with structured text and table
     - Page 3: Mixed content (alternating human and AI paragraphs)
     - Page 4: Edge cases (short text, special characters, etc.)
 
-    The generated PDF is saved to tests/outputs/input.pdf and can be used
-    to verify that bounding boxes are correctly placed in the output.
-
-    Returns: Path to the generated input.pdf
+    If the PDF kept in tests/outputs is up to date it is copied instead.
     """
-    from reportlab.platypus import Table, TableStyle, ListFlowable, ListItem
-    from reportlab.lib import colors
-    from tests.fixtures.sample_texts import AI_TEXT_LONG, SHORT_SNIPPETS
-
-    output_path = test_outputs_dir / "input.pdf"
+    if _verification_pdf_is_current(_verification_key()):
+        shutil.copy2(_VERIFICATION_PDF, output_path)
+        return
+
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import (
+        SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, ListFlowable, ListItem
+    )
+    from tests.fixtures.sample_texts import AI_TEXT_LONG_PARAGRAPHS, SHORT_SNIPPETS
 
     # Fetch Wikipedia content
     wiki_title, wiki_paragraphs = fetch_wikipedia_content()
 
     # Create PDF document
+    # Render into memory and write the file in one go
+    buffer = io.BytesIO()
     doc = SimpleDocTemplate(
-        str(output_path),
+        buffer,
         pagesize=letter,
         rightMargin=72,
         leftMargin=72,
@@ -260,96 +661,55 @@ def verification_test_pdf(test_outputs_dir):
     )
 
     elements = []
-    styles = getSampleStyleSheet()
-
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1a1a1a'),
-        spaceAfter=30,
-        alignment=TA_LEFT,
-    )
-
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        textColor=colors.HexColor('#333333'),
-        spaceAfter=20,
-        spaceBefore=20,
-        alignment=TA_LEFT,
-    )
-
-    subheading_style = ParagraphStyle(
-        'CustomSubheading',
-        parent=styles['Heading3'],
-        fontSize=14,
-        textColor=colors.HexColor('#555555'),
-        spaceAfter=12,
-        spaceBefore=12,
-        alignment=TA_LEFT,
-    )
-
-    body_style = ParagraphStyle(
-        'CustomBody',
-        parent=styles['BodyText'],
-        fontSize=12,
-        leading=16,
-        spaceAfter=12,
-        alignment=TA_LEFT,
-    )
+    styles = _paragraph_styles()
+    PlainText = _plain_text_flowable()
 
     # ========== PAGE 1: Wikipedia Content (Human-Written) ==========
-    elements.append(Paragraph("Bounding Box Verification Test PDF", title_style))
+    elements.append(Paragraph("Bounding Box Verification Test PDF", styles["verif_title"]))
     elements.append(Spacer(1, 0.2 * inch))
 
-    elements.append(Paragraph("Page 1: Human-Written Content (Wikipedia)", heading_style))
+    elements.append(Paragraph("Page 1: Human-Written Content (Wikipedia)", styles["heading"]))
     elements.append(Paragraph(
         "Expected result: <b>Green to yellow boxes</b> (low AI detection scores)",
-        body_style
+        styles["body"]
     ))
     elements.append(Spacer(1, 0.1 * inch))
 
-    elements.append(Paragraph(f"<b>{wiki_title}</b>", subheading_style))
+    elements.append(Paragraph(f"<b>{wiki_title}</b>", styles["subheading"]))
 
     # Add Wikipedia paragraphs
     for para in wiki_paragraphs[:3]:  # Limit to 3 paragraphs
-        clean_text = ' '.join(para.split())
-        elements.append(Paragraph(clean_text, body_style))
+        elements.append(PlainText(_clean(para), styles["body"]))
 
     # Add a bullet list
-    elements.append(Paragraph("<b>Key characteristics of this text:</b>", subheading_style))
+    elements.append(Paragraph("<b>Key characteristics of this text:</b>", styles["subheading"]))
     bullet_items = [
-        ListItem(Paragraph("Natural language with varied sentence structures", body_style)),
-        ListItem(Paragraph("Historical facts and biographical information", body_style)),
-        ListItem(Paragraph("Human-written Wikipedia content", body_style)),
+        ListItem(Paragraph("Natural language with varied sentence structures", styles["body"])),
+        ListItem(Paragraph("Historical facts and biographical information", styles["body"])),
+        ListItem(Paragraph("Human-written Wikipedia content", styles["body"])),
     ]
     elements.append(ListFlowable(bullet_items, bulletType='bullet'))
 
     elements.append(PageBreak())
 
     # ========== PAGE 2: AI-Generated Content ==========
-    elements.append(Paragraph("Page 2: AI-Generated Content", heading_style))
+    elements.append(Paragraph("Page 2: AI-Generated Content", styles["heading"]))
     elements.append(Paragraph(
         "Expected result: <b>Yellow to red boxes</b> (high AI detection scores)",
-        body_style
+        styles["body"]
     ))
     elements.append(Spacer(1, 0.2 * inch))
 
-    elements.append(Paragraph("Renewable Energy: A Comprehensive Analysis", subheading_style))
+    elements.append(Paragraph("Renewable Energy: A Comprehensive Analysis", styles["subheading"]))
 
     # Add AI-generated text
-    ai_paragraphs = [p.strip() for p in AI_TEXT_LONG.split('\n\n') if p.strip()]
-    for para in ai_paragraphs[:3]:  # First 3 paragraphs
-        clean_text = ' '.join(para.split())
-        elements.append(Paragraph(clean_text, body_style))
+    for para in AI_TEXT_LONG_PARAGRAPHS[:3]:  # First 3 paragraphs
+        elements.append(PlainText(_clean(para), styles["body"]))
 
     elements.append(Spacer(1, 0.2 * inch))
 
     # Add a simple table
-    elements.append(Paragraph("<b>Comparison Table</b>", subheading_style))
+    elements.append(Paragraph("<b>Comparison Table</b>", styles["subheading"]))
     table_data = [
         ['Energy Source', 'Renewable', 'Carbon Emissions'],
         ['Solar Power', 'Yes', 'Minimal'],
@@ -358,59 +718,52 @@ def verification_test_pdf(test_outputs_dir):
     ]
 
     table = Table(table_data, colWidths=[2*inch, 1.5*inch, 1.5*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-    ]))
+    table.setStyle(_ai_table_style())
     elements.append(table)
 
     elements.append(PageBreak())
 
     # ========== PAGE 3: Mixed Content ==========
-    elements.append(Paragraph("Page 3: Mixed Human and AI Content", heading_style))
+    elements.append(Paragraph("Page 3: Mixed Human and AI Content", styles["heading"]))
     elements.append(Paragraph(
         "Expected result: <b>Varied colors</b> showing clear distinction between human and AI text",
-        body_style
+        styles["body"]
     ))
     elements.append(Spacer(1, 0.2 * inch))
 
     # Alternate between human (Wikipedia) and AI paragraphs
+    # Short Wikipedia summaries have a single paragraph, which is then reused
+    wiki_paras = tuple(wiki_paragraphs) or ("Human text here.",)
     mixed_sections = [
-        ("[HUMAN] Personal Reflection:", wiki_paragraphs[0] if wiki_paragraphs else "Human text here."),
-        ("[AI] Technical Analysis:", ai_paragraphs[0] if ai_paragraphs else AI_TEXT_LONG.split('\n\n')[0]),
-        ("[HUMAN] Historical Context:", wiki_paragraphs[1] if len(wiki_paragraphs) > 1 else "More human text."),
-        ("[AI] Systematic Overview:", ai_paragraphs[1] if len(ai_paragraphs) > 1 else AI_TEXT_LONG.split('\n\n')[1]),
+        ("[HUMAN] Personal Reflection:", wiki_paras[0]),
+        ("[AI] Technical Analysis:", AI_TEXT_LONG_PARAGRAPHS[0]),
+        ("[HUMAN] Historical Context:", wiki_paras[min(1, len(wiki_paras) - 1)]),
+        ("[AI] Systematic Overview:", AI_TEXT_LONG_PARAGRAPHS[1]),
     ]
 
     for label, content in mixed_sections:
-        elements.append(Paragraph(f"<b>{label}</b>", subheading_style))
-        clean_text = ' '.join(content.split())
-        elements.append(Paragraph(clean_text, body_style))
+        elements.append(Paragraph(f"<b>{label}</b>", styles["subheading"]))
+        elements.append(PlainText(_clean(content), styles["body"]))
         elements.append(Spacer(1, 0.1 * inch))
 
     elements.append(PageBreak())
 
     # ========== PAGE 4: Edge Cases ==========
-    elements.append(Paragraph("Page 4: Edge Cases and Boundary Conditions", heading_style))
+    elements.append(Paragraph("Page 4: Edge Cases and Boundary Conditions", styles["heading"]))
     elements.append(Paragraph(
         "Expected result: <b>Minimal or no coloring</b> for very short text",
-        body_style
+        styles["body"]
     ))
     elements.append(Spacer(1, 0.2 * inch))
 
-    elements.append(Paragraph("<b>Very Short Text Snippets:</b>", subheading_style))
-    for snippet in SHORT_SNIPPETS:
-        elements.append(Paragraph(f"• {snippet}", body_style))
+    elements.append(Paragraph("<b>Very Short Text Snippets:</b>", styles["subheading"]))
+    # One paragraph with line breaks instead of a paragraph per bullet
+    snippet_bullets = "<br/>".join(f"• {html.escape(snippet)}" for snippet in SHORT_SNIPPETS)
+    elements.append(Paragraph(snippet_bullets, styles["body"]))
 
     elements.append(Spacer(1, 0.2 * inch))
 
-    elements.append(Paragraph("<b>Special Characters and Numbers:</b>", subheading_style))
+    elements.append(Paragraph("<b>Special Characters and Numbers:</b>", styles["subheading"]))
     special_cases = [
         "Email: test@example.com",
         "Phone: +1 (555) 123-4567",
@@ -420,23 +773,109 @@ def verification_test_pdf(test_outputs_dir):
         "Symbols: !@#$%^&*()",
         "Unicode: café, naïve, 日本語",
     ]
-    for case in special_cases:
-        elements.append(Paragraph(f"• {case}", body_style))
+    case_bullets = "<br/>".join(f"• {html.escape(case)}" for case in special_cases)
+    elements.append(Paragraph(case_bullets, styles["body"]))
 
     elements.append(Spacer(1, 0.2 * inch))
 
-    elements.append(Paragraph("<b>Single Words:</b>", subheading_style))
-    elements.append(Paragraph("Technology Innovation Sustainability Development Future", body_style))
+    elements.append(Paragraph("<b>Single Words:</b>", styles["subheading"]))
+    elements.append(PlainText("Technology Innovation Sustainability Development Future", styles["body"]))
 
     elements.append(Spacer(1, 0.3 * inch))
 
     elements.append(Paragraph(
         "<b>End of Verification Test PDF</b><br/>"
         "Process this PDF through the AI detection pipeline to verify bounding box placement.",
-        body_style
+        styles["body"]
     ))
 
     # Build the PDF
     doc.build(elements)
+    Path(output_path).write_bytes(buffer.getvalue())
 
-    return output_path
+
+# Every sample PDF by file name, with the function that builds it
+_SAMPLE_PDF_BUILDERS = {
+    "input_human_text.pdf": _build_human_pdf,
+    "input_ai_text.pdf": _build_ai_pdf,
+    "input_mixed_content.pdf": _build_mixed_content_pdf,
+    "input_multi_page.pdf": _build_multi_page_pdf,
+    "input.pdf": _build_verification_pdf,
+}
+
+
+def _build_sample_pdf(name: str, output_path: Path) -> None:
+    """Build one sample PDF, moving it into place only once it is complete."""
+    partial_path = output_path.with_suffix(".partial")
+    _SAMPLE_PDF_BUILDERS[name](partial_path)
+    partial_path.replace(output_path)
+
+
+@pytest.fixture(scope="session")
+def _prebuilt_pdfs(tmp_path_factory, pytestconfig):
+    """
+    Build every sample PDF once, in parallel, and return their paths by file name.
+
+    Under pytest-xdist the PDFs go to a directory shared by all workers of
+    the run; the first worker to take the lock builds them and the others
+    reuse its files. The verification PDF is only built with --visual.
+    """
+    root = tmp_path_factory.getbasetemp()
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        root = root.parent
+    root = root / "shared_pdfs"
+    root.mkdir(exist_ok=True)
+
+    visual = pytestconfig.getoption("--visual")
+    paths = {
+        name: root / name
+        for name in _SAMPLE_PDF_BUILDERS
+        if visual or name != "input.pdf"
+    }
+    with FileLock(str(root / ".lock")):
+        missing = [name for name, path in paths.items() if not path.exists()]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda name: _build_sample_pdf(name, paths[name]), missing))
+    return paths
+
+
+@pytest.fixture
+def simple_human_pdf(_prebuilt_pdfs, tmp_path):
+    """Generate a PDF with human-written text."""
+    return _link_into(_prebuilt_pdfs["input_human_text.pdf"], tmp_path)
+
+
+@pytest.fixture
+def simple_ai_pdf(_prebuilt_pdfs, tmp_path):
+    """Generate a PDF with AI-generated text."""
+    return _link_into(_prebuilt_pdfs["input_ai_text.pdf"], tmp_path)
+
+
+@pytest.fixture
+def mixed_content_pdf(_prebuilt_pdfs, tmp_path):
+    """Generate a PDF with mixed human and AI content."""
+    return _link_into(_prebuilt_pdfs["input_mixed_content.pdf"], tmp_path)
+
+
+@pytest.fixture
+def multi_page_pdf(_prebuilt_pdfs, tmp_path):
+    """Generate a multi-page PDF with varied content."""
+    return _link_into(_prebuilt_pdfs["input_multi_page.pdf"], tmp_path)
+
+
+@pytest.fixture(scope="session")
+def verification_test_pdf(_prebuilt_pdfs, test_outputs_dir):
+    """
+    Generate a comprehensive test PDF for verifying bounding box placement.
+
+    See _build_verification_pdf for the layout. The PDF is copied to
+    tests/outputs/input.pdf and can be used to verify that bounding boxes
+    are correctly placed in the output.
+
+    Returns: Path to the generated input.pdf
+    """
+    key = _verification_key()
+    if not _verification_pdf_is_current(key):
+        shutil.copy2(_prebuilt_pdfs["input.pdf"], _VERIFICATION_PDF)
+        _VERIFICATION_HASH.write_text(key)
+    return _VERIFICATION_PDF
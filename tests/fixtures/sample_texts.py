@@ -68,6 +68,9 @@ Public awareness and concern about environmental issues drive demand for
 cleaner energy alternatives.
 """
 
+# Paragraphs of AI_TEXT_LONG, split once at import
+AI_TEXT_LONG_PARAGRAPHS = tuple(p.strip() for p in AI_TEXT_LONG.split('\n\n') if p.strip())
+
 # Mixed content (combination of human and AI characteristics)
 MIXED_TEXT = """
 I recently read an article about quantum computing, and honestly, my brain
@@ -89,10 +92,10 @@ I was living in the future!
 """
 
 # Very short snippets for edge case testing
-SHORT_SNIPPETS = [
+SHORT_SNIPPETS = (
     "The quick brown fox jumps over the lazy dog.",
     "Hello, world!",
     "Machine learning is a subset of artificial intelligence.",
     "I love pizza.",
     "The weather today is quite pleasant.",
-]
+)